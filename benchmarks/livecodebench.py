@@ -1,24 +1,27 @@
 import asyncio
-import json
 import os
 import multiprocessing
-import threading
 import time
 import base64
 import zlib
 import pickle
+import traceback
 from collections import defaultdict
 from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import aiofiles
 import numpy as np
+import orjson
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
 from tqdm import tqdm
+from tqdm.asyncio import tqdm_asyncio
 
 from benchmarks.benchmark import BaseBenchmark
-from scripts.logs import logger
+from scripts.logs import LogLevel, logger
 import sys
 sys.path.append("..")
 sys.path.append("benchmarks")
@@ -28,227 +31,445 @@ from scripts.utils.lcb_test import run_test  # 确保已安装lcb_runner
 #sys.set_int_max_str_digits(50000)
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-def _temp_run(sample, generation, debug, result, metadata_list, timeout):
+def _temp_run(sample, generation, debug, conn, timeout, collect_metadata=True):
     res, metadata = run_test(sample, test=generation, debug=debug, timeout=timeout)
-    result.append(res)
-    metadata_list.append(metadata)
-
-def check_correctness(sample, generation, timeout, debug=True):
-    manager = multiprocessing.Manager()
-    result = manager.list()
-    metadata_list = manager.list()
-    p = multiprocessing.Process(
+    # 不需要metadata时只回传测试结果，减少进程间传输
+    conn.send((res, metadata if collect_metadata else None))
+    conn.close()
+
+def _mp_context():
+    # Linux下显式使用fork，避免子进程重新导入整个模块；其他平台使用默认启动方式（macOS上fork多线程进程不安全）
+    return multiprocessing.get_context("fork" if sys.platform.startswith("linux") else None)
+
+# evaluation_details 中可能包含numpy标量
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _jdumps(obj) -> str:
+    return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode("utf-8")
+
+def _load_input_output(sample) -> dict:
+    # input_output 可能是dict（load_data生成）或JSON字符串（外部传入）
+    in_outs = sample["input_output"]
+    return orjson.loads(in_outs) if isinstance(in_outs, str) else in_outs
+
+def _global_timeout_result(sample, num_inputs, debug):
+    if debug:
+        logger.warning(f"全局超时: {sample.get('task_id', 'unknown')}")
+    return [-1 for _ in range(num_inputs)], {"error_code": -1, "error_message": "Global Timeout"}
+
+def check_correctness(sample, generation, timeout, debug=True, num_inputs=None, collect_metadata=True):
+    if num_inputs is None:
+        num_inputs = sample.get("num_inputs") or len(_load_input_output(sample)["inputs"])
+    parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+    p = _mp_context().Process(
         target=_temp_run,
-        args=(sample, generation, debug, result, metadata_list, timeout),
+        args=(sample, generation, debug, child_conn, timeout, collect_metadata),
     )
     p.start()
-    p.join(
-        timeout=(timeout + 1) * len(json.loads(sample["input_output"])["inputs"]) + 5
-    )
+    child_conn.close()
+    overall_timeout = (timeout + 1) * num_inputs + 5
+    result, metadata = None, None
+    try:
+        if parent_conn.poll(overall_timeout):
+            result, metadata = parent_conn.recv()
+    except EOFError:
+        # 子进程在返回结果前异常退出
+        pass
+    finally:
+        parent_conn.close()
+    if result is not None:
+        p.join(timeout=1)
     if p.is_alive():
         p.kill()
-    if not result:
-        in_outs = json.loads(sample["input_output"])
-        result = [[-1 for _ in range(len(in_outs["inputs"]))]]
-        if debug:
-            logger.warning(f"全局超时: {sample.get('task_id', 'unknown')}")
+        p.join()
+    if result is None:
+        return _global_timeout_result(sample, num_inputs, debug)
 
-    return result[0], metadata_list[0]
+    return result, metadata
 
-def evaluate_generations_by_problem(args):
-    problem_generations, sample, debug, timeout = args
-    res = []
-    metadata = []
-    for generation in problem_generations:
-        curr_res = [-2]
+# 超过该大小的sample直接随参数pickle传递，避免占满 /dev/shm（Docker默认仅64MB）
+_SHM_MAX_BYTES = 4 * 1024 * 1024
+
+def _share_sample(sample) -> Tuple[Optional[shared_memory.SharedMemory], Any]:
+    """将sample序列化后写入共享内存，返回 (共享内存, 传给worker的引用)；过大时引用即为sample本身"""
+    # 测试用例占sample的绝大部分，按其长度估算大小，过大的sample不在此处序列化，只由进程池pickle一次
+    in_outs = _load_input_output(sample)
+    if sum(map(len, in_outs["inputs"])) + sum(map(len, in_outs["outputs"])) > _SHM_MAX_BYTES:
+        return None, sample
+    buf = pickle.dumps(sample, protocol=pickle.HIGHEST_PROTOCOL)
+    shm = shared_memory.SharedMemory(create=True, size=len(buf))
+    shm.buf[:len(buf)] = buf
+    return shm, (shm.name, len(buf))
+
+def _load_shared_sample(sample_ref):
+    if isinstance(sample_ref, dict):
+        return sample_ref
+    name, size = sample_ref
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        return pickle.loads(shm.buf[:size])
+    finally:
+        shm.close()
+
+def _evaluate_generation(sample, generation, debug, timeout, num_inputs):
+    curr_res = [-2]
+    try:
+        # metadata 仅用于调试信息，非debug模式下不回传
+        curr_res, curr_metadata = check_correctness(
+            sample, generation, timeout=timeout, debug=debug, num_inputs=num_inputs, collect_metadata=debug
+        )
+        if curr_metadata is None:
+            curr_metadata = {}
+        # 结果只包含 -4~1 及 True/False，一次性转换为int8
         try:
-            curr_res, curr_metadata = check_correctness(
-                sample, generation, timeout=timeout, debug=debug
-            )
-            fixed = []
-            for e in curr_res:
-                if isinstance(e, np.ndarray):
-                    e = e.item(0)
-                if isinstance(e, np.bool_):
-                    e = bool(e)
-                fixed.append(e)
-            curr_res = fixed
-        except Exception as e:
-            curr_metadata = {
-                "error": repr(e),
-                "error_code": -5,
-                "error_message": "TestRunnerError",
-            }
-        finally:
-            res.append(curr_res)
-            metadata.append(curr_metadata)
+            res_arr = np.asarray(curr_res, dtype=object)
+            if res_arr.ndim > 1:
+                # call-based解答返回ndarray时每个结果都是ndarray，与逐项 .item(0) 一致只取第一个元素
+                res_arr = res_arr.reshape(len(res_arr), -1)[:, 0]
+            curr_res = res_arr.astype(np.int8).tolist()
+        except Exception:
+            curr_res = [
+                e.item(0) if isinstance(e, np.ndarray) else bool(e) if isinstance(e, np.bool_) else e
+                for e in curr_res
+            ]
+    except Exception as e:
+        curr_metadata = {
+            "error": repr(e),
+            "error_code": -5,
+            "error_message": "TestRunnerError",
+        }
+    return curr_res, curr_metadata
+
+def evaluate_generations_by_problem(args):
+    problem_generations, sample_ref, num_inputs, debug, timeout = args
+    sample = _load_shared_sample(sample_ref)
+    if len(problem_generations) == 1:
+        # 单个生成结果时直接评测，避免额外的进程池开销
+        outcomes = [_evaluate_generation(sample, problem_generations[0], debug, timeout, num_inputs)]
+    else:
+        # 多个生成结果相互独立，并行评测并按提交顺序收集
+        max_workers = min(len(problem_generations), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=_mp_context(), initializer=_unpin_worker) as executor:
+            futures = [
+                executor.submit(_evaluate_generation, sample, generation, debug, timeout, num_inputs)
+                for generation in problem_generations
+            ]
+            outcomes = [future.result() for future in futures]
+    res = [curr_res for curr_res, _ in outcomes]
+    metadata = [curr_metadata for _, curr_metadata in outcomes]
     return res, metadata
 
+def _decode_private_tests(encoded: str):
+    # JSON格式以 [ 或 { 开头，其余为 base64(zlib(pickle(json))) 格式
+    if encoded and encoded[0] in "[{":
+        return orjson.loads(encoded)
+    return orjson.loads(pickle.loads(zlib.decompress(base64.b64decode(encoded))))
+
+def _decode_item(item) -> Optional[dict]:
+    """将原始数据项转换为LiveCodeBench评测格式，失败时返回None"""
+    try:
+        # 处理私有测试用例（只使用private test cases进行评测）
+        private_tests = _decode_private_tests(item["private_test_cases"])
+        
+        item_metadata = orjson.loads(item["metadata"]) if item["metadata"] else {}
+
+        # 构建评测样本
+        return {
+            "question": item["question_content"],
+            "input_output": {
+                "inputs": [t["input"] for t in private_tests],
+                "outputs": [t["output"] for t in private_tests],
+                "fn_name": item_metadata.get("func_name", None)
+            },
+            "num_inputs": len(private_tests),
+            "task_id": f"{item['contest_id']}_{item['question_id']}",
+            "canonical_solution": item.get("starter_code", ""),
+            "metadata": {
+                "difficulty": item.get("difficulty", "unknown"),
+                "platform": item.get("platform", "unknown"),
+                # 保留原始数据，去掉已解码的测试用例，避免从进程池回传时重复携带编码后的数据
+                "original_data": {k: v for k, v in item.items() if k != "private_test_cases"}
+            }
+        }
+    except Exception as e:
+        logger.error(f"处理数据时出错: {str(e)}")
+        return None
+
+_DECODE_CHUNK_SIZE = 32
+
+def _decode_items(items: List[dict]) -> List[dict]:
+    return [p for p in map(_decode_item, items) if p is not None]
+
+def _load_jsonl(file_path):
+    # 本地文件同步读取比aiofiles逐行切换线程更快
+    with open(file_path, "rb") as f:
+        return [orjson.loads(line) for line in f if line.strip()]
+
+def _physical_cores() -> List[int]:
+    """每个物理核心取一个可用的逻辑CPU编号，无法识别拓扑时返回全部可用CPU"""
+    allowed = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    try:
+        cores = {}
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for block in f.read().strip().split("\n\n"):
+                info = dict(line.split(":", 1) for line in block.splitlines() if ":" in line)
+                info = {k.strip(): v.strip() for k, v in info.items()}
+                cpu = int(info["processor"])
+                key = (info.get("physical id", "0"), info.get("core id", str(cpu)))
+                if cpu in allowed:
+                    cores.setdefault(key, cpu)
+        return sorted(cores.values()) or allowed
+    except (OSError, KeyError, ValueError):
+        return allowed
+
+# worker绑定单核前的可用CPU集合，供需要多核的子进程恢复
+_allowed_cpus = None
+
+def _worker_init(cores: List[int] = None, worker_counter=None):
+    # 预先导入评测依赖，避免每个任务首次执行时的导入开销
+    import scripts.utils.lcb_test  # noqa: F401
+    # 每个worker绑定到一个物理核心，避免超线程争用和跨NUMA调度；编号由本进程池的计数器分配
+    global _allowed_cpus
+    if cores and worker_counter is not None and hasattr(os, "sched_setaffinity"):
+        with worker_counter.get_lock():
+            worker_id = worker_counter.value
+            worker_counter.value += 1
+        if worker_id < len(cores):
+            allowed = os.sched_getaffinity(0)
+            try:
+                os.sched_setaffinity(0, {cores[worker_id]})
+                _allowed_cpus = allowed
+            except OSError:
+                pass  # 绑定失败不影响评测
+
+def _unpin_worker():
+    if _allowed_cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, _allowed_cpus)
+
+class ResultWriteError(RuntimeError):
+    pass
+
 class LiveCodeBench(BaseBenchmark):
-    def __init__(self, name: str, file_path: str, log_path: str, timeout: int = 6):
+    def __init__(
+        self, name: str, file_path: str, log_path: str, timeout: int = 6, num_process_evaluate: int = None
+    ):
         super().__init__(name, file_path, log_path)
         self.timeout = timeout
-        self.num_process_evaluate = min(16, os.cpu_count() or 4)
+        # 按物理核心数限制评测进程数；核心数很多（如128核）的机器上多进程开销会急剧上升，建议通过参数进一步调低
+        self._cores = _physical_cores()
+        self.num_process_evaluate = num_process_evaluate or min(16, max(1, len(self._cores)))
+        self._processed_data = None  # 缓存解码后的数据，避免重复解压测试用例
+        self._writers: Dict[str, Tuple[asyncio.Queue, asyncio.Task]] = {}  # save_path -> (写入队列, 后台写入任务)
+        # 持久化进程池，所有问题共享，首次使用时创建，aclose后可再次创建
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # 限制同时评测的问题数，从而限制同时存在的共享内存块数量
+        self._grade_semaphore: Optional[asyncio.Semaphore] = None
 
-    class TimeoutError(Exception):
-        pass
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # 先启动resource_tracker，使worker共享同一个tracker，避免共享内存被重复追踪
+            if os.name == "posix":
+                resource_tracker.ensure_running()
+            ctx = _mp_context()
+            # worker数超过物理核心数时无法一核一worker，不做绑定
+            cores = self._cores if self.num_process_evaluate <= len(self._cores) else None
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_process_evaluate, mp_context=ctx, initializer=_worker_init,
+                initargs=(cores, ctx.Value("i", 0))
+            )
+        return self._pool
 
-    def run_with_timeout(self, func, args, timeout):
-        result = []
-        exception_occurred = []
-        stop_event = threading.Event()
+    async def _run_in_pool(self, func: Callable, *args):
+        # worker异常退出（OOM、段错误等）会使整个进程池不可用，重建进程池后重试一次
+        pool = self._get_pool()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            if self._pool is pool:
+                logger.warning("进程池已损坏，重新创建进程池")
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            return await loop.run_in_executor(self._get_pool(), func, *args)
 
-        def target():
-            try:
-                return_value = func(*args)
-                result.append(return_value)
-            except Exception as e:
-                exception_occurred.append(e)
-            finally:
-                stop_event.set()
+    def _get_write_queue(self, save_path: str) -> asyncio.Queue:
+        # 队列与写入任务需在事件循环中创建，首次写入时再初始化
+        if save_path not in self._writers:
+            queue = asyncio.Queue()
+            task = asyncio.create_task(self._writer_loop(save_path, queue))
+            self._writers[save_path] = (queue, task)
+        queue, task = self._writers[save_path]
+        if task.done():
+            # 写入任务已退出（路径错误、磁盘错误等），继续入队的结果会被静默丢弃
+            del self._writers[save_path]
+            raise ResultWriteError(f"结果写入任务已退出: {save_path}") from task.exception()
+        return queue
 
-        thread = threading.Thread(target=target)
-        thread.start()
-        is_timeout = not stop_event.wait(timeout)
+    async def _writer_loop(self, save_path: str, queue: asyncio.Queue):
+        async with aiofiles.open(save_path, mode="ab") as file:
+            while True:
+                batch = [await queue.get()]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                lines = [line for line in batch if line is not None]
+                if lines:
+                    await file.write(b"".join(lines))
+                    await file.flush()
+                if len(lines) < len(batch):  # 收到结束标记 None
+                    return
+
+    async def _close_writers(self):
+        writers, self._writers = self._writers, {}
+        for queue, task in writers.values():
+            if not task.done():
+                await queue.put(None)
+        results = await asyncio.gather(*[task for _, task in writers.values()], return_exceptions=True)
+        for (save_path, _), result in zip(writers.items(), results):
+            if isinstance(result, Exception):
+                raise ResultWriteError(f"结果写入失败: {save_path}") from result
+
+    async def aclose(self):
+        await self._close_writers()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self._grade_semaphore = None
 
-        if is_timeout:
-            raise self.TimeoutError("Function execution timed out")
-        if exception_occurred:
-            raise exception_occurred[0]
-        return result[0] if result else None
     def parse_code(self,prediction):
-        prediction = prediction.split("```python")[-1]
-        prediction = prediction.split("```")[0]
+        # 取最后一个```python代码块，partition找到第一个分隔符即停止，无需切分整段输出
+        _, _, prediction = prediction.rpartition("```python")
+        prediction, _, _ = prediction.partition("```")
         return prediction
     async def load_data(self, specific_indices: List[int] = None) -> List[dict]:
         """从JSONL文件加载数据并转换为LiveCodeBench评测格式"""
-        raw_data = []
-        async with aiofiles.open(self.file_path, mode="r", encoding="utf-8") as file:
-            async for line in file:
-                raw_data.append(json.loads(line))
-        
-        # 转换为评测格式
-        processed_data = []
-        for item in raw_data:
-            try:
-                # 处理私有测试用例（只使用private test cases进行评测）
-                try:
-                    private_tests = json.loads(item["private_test_cases"])
-                except:
-                    private_tests = json.loads(
-                        pickle.loads(
-                            zlib.decompress(
-                                base64.b64decode(item["private_test_cases"].encode("utf-8"))
-                            )
-                        )
-                    )
-                
-                # 构建评测样本
-                processed_item = {
-                    "question": item["question_content"],
-                    "input_output": json.dumps({
-                        "inputs": [t["input"] for t in private_tests],
-                        "outputs": [t["output"] for t in private_tests],
-                        "fn_name": json.loads(item["metadata"]).get("func_name", None) if item["metadata"] else None
-                    }),
-                    "task_id": f"{item['contest_id']}_{item['question_id']}",
-                    "canonical_solution": item.get("starter_code", ""),
-                    "metadata": {
-                        "difficulty": item.get("difficulty", "unknown"),
-                        "platform": item.get("platform", "unknown"),
-                        "original_data": item  # 保留原始数据
-                    }
-                }
-                processed_data.append(processed_item)   
-            
-            except Exception as e:
-                logger.error(f"处理数据时出错: {str(e)}")
-                continue
-        
+        if self._processed_data is None:
+            self._processed_data = await self._load_processed_data()
+        processed_data = self._processed_data
         if specific_indices is not None:
             return [processed_data[i] for i in specific_indices if i < len(processed_data)]
-        return processed_data
+        return list(processed_data)
+
+    async def _load_processed_data(self) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        raw_data = await loop.run_in_executor(None, _load_jsonl, self.file_path)
+        
+        # 转换为评测格式，解压测试用例为CPU密集操作，按块分发到进程池并行处理；单进程时直接在线程中解码，省去进程间拷贝
+        if self.num_process_evaluate <= 1:
+            return await loop.run_in_executor(None, _decode_items, raw_data)
+        chunks = [raw_data[i:i + _DECODE_CHUNK_SIZE] for i in range(0, len(raw_data), _DECODE_CHUNK_SIZE)]
+        decoded_chunks = await asyncio.gather(*[self._run_in_pool(_decode_items, chunk) for chunk in chunks])
+        return [p for chunk in decoded_chunks for p in chunk]
 
     @retry(stop=stop_after_attempt(3), wait=wait_fixed(2), retry=retry_if_exception_type(Exception), reraise=True)
     async def _generate_output(self, agent: Callable, prompt: str, entry_point:str) -> Tuple[str, float]:
         # entry_point = "" # 要写func name
         return await asyncio.wait_for(agent(prompt, entry_point), timeout=120)
 
-    async def evaluate_problem(self, problem: dict, agent: Callable, save_path: str = None) -> Tuple[str, str, str, float, Dict, float]:
+    async def _generate_only(self, problem: dict, agent: Callable) -> Tuple[str, float]:
         question = problem["question"]
         task_id = problem["task_id"]
+        # 生成代码
+        entry_point = problem["metadata"].get("func_name", "wrapped_function") if problem["metadata"] else "wrapped_function"
+        logger.info(f"entry_point: {entry_point}")
+        prediction, cost = await self._generate_output(agent, question, entry_point)
+        logger.info(f"完成代码生成，任务: {task_id}, 成本: {cost}")
+        prediction = self.parse_code(prediction)
+        return prediction, cost
+
+    async def _grade_only(self, problem: dict, prediction: str, cost: float, save_path: str = None) -> Tuple[str, str, str, float, Dict, float]:
+        question = problem["question"]
+        task_id = problem["task_id"]
+        # 使用LiveCodeBench的评测逻辑
+        sample = {
+            "question": question,
+            "input_output": problem["input_output"],
+            "num_inputs": problem.get("num_inputs") or len(_load_input_output(problem)["inputs"]),
+            "task_id": task_id
+        }
+        #logger.info(f"开始评估sample {sample['input_output']}")
         
-        try:
-            logger.info(f"开始评估 LiveCodeBench 问题: {task_id}")
-            
-            # 生成代码
-            entry_point = problem["metadata"].get("func_name", "wrapped_function") if problem["metadata"] else "wrapped_function"
-            logger.info(f"entry_point: {entry_point}")
-            prediction, cost = await self._generate_output(agent, question, entry_point)
-            logger.info(f"完成代码生成，任务: {task_id}, 成本: {cost}")
-            prediction = self.parse_code(prediction)
-            # 使用LiveCodeBench的评测逻辑
-            sample = {
-                "question": question,
-                "input_output": problem["input_output"],
-                "task_id": task_id
-            }
-            #logger.info(f"开始评估sample {sample['input_output']}")
-            
-            # 在多进程环境中评估
-            args = ([prediction], sample, False, self.timeout)
-            loop = asyncio.get_running_loop()
-            with ProcessPoolExecutor(max_workers=1) as executor:
-                results, metadata = await loop.run_in_executor(
-                    executor, evaluate_generations_by_problem, args
-                )
-            
-            # 解析结果
-            logger.info(f"测试结果：{results}")
-            test_results = results[0]  # 取第一个(也是唯一一个)生成结果的所有测试用例结果
-            test_metadata = metadata[0]
-            passed = all(r == 1 for r in test_results)
-            score = 1.0 if passed else 0.0
-            
-            # 构建结果详情
-            evaluation_details = {
-                "task_id": task_id,
-                "test_results": test_results,
-                "metadata": test_metadata,
-                "execution_success": passed,
-                "difficulty": problem.get("metadata", {}).get("difficulty", "unknown"),
-                "platform": problem.get("metadata", {}).get("platform", "unknown")
-            }
-            
-            # 构建预期输出（用于日志）
-            expected_output = {
+        # 在多进程环境中评估，sample通过共享内存传递；共享内存在占用评测名额后才创建
+        if self._grade_semaphore is None:
+            self._grade_semaphore = asyncio.Semaphore(self.num_process_evaluate)
+        async with self._grade_semaphore:
+            shm, sample_ref = _share_sample(sample)
+            try:
+                args = ([prediction], sample_ref, sample["num_inputs"], False, self.timeout)
+                results, metadata = await self._run_in_pool(evaluate_generations_by_problem, args)
+            finally:
+                if shm is not None:
+                    shm.close()
+                    shm.unlink()
+        
+        # 解析结果
+        logger.info(f"测试结果：{results}")
+        test_results = np.asarray(results[0], dtype=np.int8)  # 取第一个(也是唯一一个)生成结果的所有测试用例结果
+        test_metadata = metadata[0]
+        passed = bool(np.all(test_results == 1))
+        score = 1.0 if passed else 0.0
+        
+        # 构建结果详情
+        evaluation_details = {
+            "task_id": task_id,
+            "test_results": test_results.tolist(),
+            "metadata": test_metadata,
+            "execution_success": passed,
+            "difficulty": problem.get("metadata", {}).get("difficulty", "unknown"),
+            "platform": problem.get("metadata", {}).get("platform", "unknown")
+        }
+        
+        # 预期输出只用于失败日志，通过时不再构建
+        expected_output_str = ""
+
+        # 记录失败情况
+        if not passed:
+            expected_output_str = _jdumps({
                 "task_id": task_id,
                 "difficulty": evaluation_details["difficulty"],
                 "platform": evaluation_details["platform"],
                 "canonical_solution": problem.get("canonical_solution", "")
-            }
+            })
+            self.log_mismatch(
+                problem=question,
+                expected_output=expected_output_str,
+                prediction=prediction,
+                extracted_output=prediction,
+                extract_answer_code="N/A"
+            )
+            logger.warning(f"任务失败: {task_id}, 得分: {score}")
+        else:
+            logger.info(f"任务成功: {task_id}, 得分: {score}")
 
-            # 记录失败情况
-            if not passed:
-                self.log_mismatch(
-                    problem=question,
-                    expected_output=json.dumps(expected_output),
-                    prediction=prediction,
-                    extracted_output=prediction,
-                    extract_answer_code="N/A"
-                )
-                logger.warning(f"任务失败: {task_id}, 得分: {score}")
-            else:
-                logger.info(f"任务成功: {task_id}, 得分: {score}")
+        result = (question, prediction, expected_output_str, score, evaluation_details, cost)
+        
+        # 保存结果，由后台写入任务统一追加到文件
+        if save_path:
+            await self._get_write_queue(save_path).put(
+                orjson.dumps(result, option=_ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+            )
+        
+        return result
 
-            result = (question, prediction, json.dumps(expected_output), score, evaluation_details, cost)
-            
-            # 保存结果
-            if save_path:
-                async with aiofiles.open(save_path, mode="a", encoding="utf-8") as file:
-                    await file.write(json.dumps(result) + "\n")
+    async def evaluate_problem(
+        self, problem: dict, agent: Callable, save_path: str = None, generation_semaphore: asyncio.Semaphore = None
+    ) -> Tuple[str, str, str, float, Dict, float]:
+        question = problem["question"]
+        task_id = problem["task_id"]
+        
+        try:
+            logger.info(f"开始评估 LiveCodeBench 问题: {task_id}")
             
-            return result
+            # 只在代码生成阶段占用并发名额，评测在进程池中进行时即可开始下一个问题的生成
+            if generation_semaphore is None:
+                prediction, cost = await self._generate_only(problem, agent)
+            else:
+                async with generation_semaphore:
+                    prediction, cost = await self._generate_only(problem, agent)
+            return await self._grade_only(problem, prediction, cost, save_path)
+
+        except ResultWriteError:
+            # 结果无法落盘时直接中断评测，不计为单个问题的失败
+            raise
 
         except asyncio.TimeoutError:
             logger.error(f"代码生成超时: {task_id}")
@@ -256,9 +477,10 @@ class LiveCodeBench(BaseBenchmark):
             return (question, "Timeout", "", 0.0, evaluation_details, 0.0)
         
         except Exception as e:
-            import traceback
-            traceback.print_exc()
             logger.error(f"评估出错: {task_id}, 错误: {e}")
+            # 只有开启DEBUG日志时才格式化完整堆栈
+            if logger.log_level <= LogLevel.DEBUG.value[0]:
+                logger.debug(traceback.format_exc())
             evaluation_details = {"task_id": task_id, "error": str(e)}
             return (question, f"评估出错: {str(e)}", "", 0.0, evaluation_details, 0.0)
 
@@ -268,46 +490,71 @@ class LiveCodeBench(BaseBenchmark):
     def get_result_columns(self) -> List[str]:
         return ["question", "prediction", "expected_output", "score", "evaluation_details", "cost"]
 
+    async def evaluate_all_problems(
+        self, data: List[dict], agent: Callable, max_concurrent_tasks: int = 50, *, save_path: str = None
+    ):
+        # 代码生成（网络IO）与评测（子进程CPU）流水线并行
+        semaphore = asyncio.Semaphore(max_concurrent_tasks)
+        tasks = [
+            self.evaluate_problem(problem, agent, save_path=save_path, generation_semaphore=semaphore)
+            for problem in data
+        ]
+        return await tqdm_asyncio.gather(*tasks, desc=f"Evaluating {self.name} problems", total=len(data))
+
+    async def run_evaluation(self, agent: Callable, va_list: List[int], max_concurrent_tasks: int = 50):
+        try:
+            return await super().run_evaluation(agent, va_list, max_concurrent_tasks)
+        finally:
+            await self.aclose()
+
+    async def run_baseline(self, agent: Callable, max_concurrent_tasks: int = 50):
+        try:
+            return await super().run_baseline(agent, max_concurrent_tasks)
+        finally:
+            await self.aclose()
+
     async def run_baseline_with_load_data(self, agent: Callable, past_data_path: str = None, max_concurrent_tasks: int = 10):
-        all_data = await self.load_data()
+        try:
+            all_data = await self.load_data()
         
-        if not past_data_path:
-            past_data_path = os.path.join(self.log_path, f"{self.name}_results.jsonl")
+            if not past_data_path:
+                past_data_path = os.path.join(self.log_path, f"{self.name}_results.jsonl")
         
-        # 加载历史结果
-        past_results = {}
-        if os.path.exists(past_data_path):
-            async with aiofiles.open(past_data_path, mode="r", encoding="utf-8") as file:
-                async for line in file:
-                    try:
-                        result = json.loads(line)
-                        # 使用问题内容作为键
-                        past_results[result[0]] = result
-                    except:
-                        continue
-
-        # 过滤新问题
-        new_data = [p for p in all_data if p["question"] not in past_results]
+            # 加载历史结果，使用task_id作为键
+            past_results = {}
+            if os.path.exists(past_data_path):
+                async with aiofiles.open(past_data_path, mode="r", encoding="utf-8") as file:
+                    async for line in file:
+                        try:
+                            result = orjson.loads(line)
+                            past_results[result[4]["task_id"]] = result
+                        except:
+                            continue
+
+            # 过滤新问题
+            new_data = [p for p in all_data if p["task_id"] not in past_results]
         
-        if not new_data:
-            logger.info("所有问题都已评估完成")
-            return None, None, None
+            if not new_data:
+                logger.info("所有问题都已评估完成")
+                return None, None, None
 
-        logger.info(f"发现 {len(new_data)} 个新问题需要评估，共 {len(all_data)} 个问题")
+            logger.info(f"发现 {len(new_data)} 个新问题需要评估，共 {len(all_data)} 个问题")
 
-        # 评估新问题
-        new_results = await self.evaluate_all_problems(
-            new_data, agent, save_path=past_data_path, max_concurrent_tasks=max_concurrent_tasks
-        )
+            # 评估新问题
+            new_results = await self.evaluate_all_problems(
+                new_data, agent, save_path=past_data_path, max_concurrent_tasks=max_concurrent_tasks
+            )
         
-        # 合并结果
-        all_results = list(past_results.values()) + new_results
+            # 合并结果
+            all_results = list(past_results.values()) + new_results
         
-        # 保存最终结果
-        columns = self.get_result_columns()
-        average_score, average_cost, total_cost = self.save_results_to_csv(all_results, columns)
+            # 保存最终结果
+            columns = self.get_result_columns()
+            average_score, average_cost, total_cost = self.save_results_to_csv(all_results, columns)
         
-        logger.info(f"{self.name} 数据集平均得分: {average_score:.5f}")
-        logger.info(f"总成本: {total_cost:.5f}")
-        logger.info(f"平均成本: {average_cost:.5f}")
-        return average_score, average_cost, total_cost
\ No newline at end of file
+            logger.info(f"{self.name} 数据集平均得分: {average_score:.5f}")
+            logger.info(f"总成本: {total_cost:.5f}")
+            logger.info(f"平均成本: {average_cost:.5f}")
+            return average_score, average_cost, total_cost
+        finally:
+            await self.aclose()
@@ -527,7 +527,9 @@ def run_test(sample, test=None, debug=False, timeout=6):
         print(f"start = {datetime.now().time()}")
 
     try:
-        in_outs = json.loads(sample["input_output"])
+        in_outs = sample["input_output"]
+        if isinstance(in_outs, str):
+            in_outs = json.loads(in_outs)
     except ValueError as e:
         raise e
         in_outs = None